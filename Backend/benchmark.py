@@ -0,0 +1,277 @@
+"""
+Offline benchmark for the podcast pipeline.
+
+Runs every file in a corpus through the same job pipeline as /upload_file/,
+with local stub summarizer, Gemini, ElevenLabs and Firestore backends, and
+reports per-stage latency percentiles and overall throughput.
+
+    python benchmark.py                          # synthetic corpus
+    python benchmark.py --corpus samples/ --jobs 20 --output bench.json
+    python benchmark.py --baseline bench.json    # exit 1 on a p95 regression
+    python benchmark.py --warm-cache             # measure with the content cache pre-filled
+"""
+import argparse
+import json
+import os
+import re
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import wait
+
+# Keep benchmark runs from reading or polluting the real content cache and Firestore spill file
+BENCH_DIR = tempfile.mkdtemp(prefix="podcast-bench-")
+os.environ.setdefault("CACHE_DIR", os.path.join(BENCH_DIR, "cache"))
+os.environ.setdefault("FIRESTORE_SPILL_PATH", os.path.join(BENCH_DIR, "firestore_spill.jsonl"))
+
+import main
+from fake_firestore import FakeFirestore
+
+# ============================================================
+# 1️⃣ Stub Backends
+# ============================================================
+class StubTokenizer:
+    def __call__(self, text, add_special_tokens=False, return_offsets_mapping=False):
+        return {"offset_mapping": [match.span() for match in re.finditer(r"\S+", text)]}
+
+class StubSummarizer:
+    def __init__(self, seconds_per_1k_tokens: float):
+        self.tokenizer = StubTokenizer()
+        self.seconds_per_1k_tokens = seconds_per_1k_tokens
+
+    def __call__(self, inputs, max_length=256, **kwargs):
+        batch = [inputs] if isinstance(inputs, str) else inputs
+        results = []
+        for text in batch:
+            words = text.split()
+            time.sleep(len(words) / 1000 * self.seconds_per_1k_tokens)
+            results.append({"summary_text": " ".join(words[:max_length])})
+        return results
+
+class StubResponse:
+    def __init__(self, text: str):
+        self.text = text
+
+class StubGemini:
+    def __init__(self, latency: float, lines: int):
+        self.latency = latency
+        self.lines = lines
+
+    def generate_content(self, prompt: str, stream: bool = False):
+        speakers = ("Alex", "Jordan")
+        lines = [
+            f"{speakers[i % 2]}: Line {i} of the episode about {len(prompt)} characters of summary.\n"
+            for i in range(self.lines)
+        ]
+        if not stream:
+            time.sleep(self.latency)
+            return StubResponse("".join(lines))
+        return self.stream_lines(lines)
+
+    def stream_lines(self, lines: list):
+        # Spread the latency over the script and split chunks mid-line, like a real token stream
+        for line in lines:
+            half = len(line) // 2
+            for piece in (line[:half], line[half:]):
+                time.sleep(self.latency / (2 * len(lines)))
+                yield StubResponse(piece)
+
+class StubTextToSpeech:
+    def __init__(self, latency: float):
+        self.latency = latency
+
+    def convert(self, voice_id: str, model_id: str, text: str):
+        time.sleep(self.latency)
+        # Roughly one 128 kbps MP3 second per 15 characters
+        yield b"\xff\xfb" * (len(text) * 550)
+
+class StubTTSClient:
+    def __init__(self, latency: float):
+        self.text_to_speech = StubTextToSpeech(latency)
+
+class ColdCache:
+    # Always misses, so every job pays for extraction, summarization, script and TTS
+    def get(self, namespace: str, key: str):
+        return None
+
+    def set(self, namespace: str, key: str, value: bytes):
+        pass
+
+    def report(self):
+        return {"entries": 0, "bytes": 0, "maxBytes": 0, "namespaces": {}}
+
+def install_stubs(args):
+    main.summarizer_model.set(StubSummarizer(args.summarizer_latency))
+    main.gemini_model.set(StubGemini(args.llm_latency, args.script_lines))
+    main.tts_client.set(StubTTSClient(args.tts_latency))
+    main.firebase_db.set(FakeFirestore())
+    if not args.warm_cache:
+        main.cache = ColdCache()
+
+# ============================================================
+# 2️⃣ Corpus
+# ============================================================
+SAMPLE_SENTENCE = (
+    "The history of computing is a story of people finding faster ways to do arithmetic, "
+    "then discovering that arithmetic was never really the point."
+)
+
+def make_pdf(pages: list):
+    # Minimal single-font PDF with one text stream per page, enough for pypdf to extract
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>", None, "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for text in pages:
+        lines = "".join(f"({line}) Tj T* " for line in text.split("\n"))
+        stream = f"BT /F1 10 Tf 12 TL 40 760 Td {lines}ET"
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+        objects.append(
+            "<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {len(objects)} 0 R >>"
+        )
+        kids.append(f"{len(objects)} 0 R")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(kids)} >>"
+
+    pdf = "%PDF-1.4\n"
+    offsets = []
+    for number, obj in enumerate(objects, 1):
+        offsets.append(len(pdf))
+        pdf += f"{number} 0 obj\n{obj}\nendobj\n"
+    xref = len(pdf)
+    pdf += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n"
+    pdf += "".join(f"{offset:010d} 00000 n \n" for offset in offsets)
+    pdf += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n"
+    return pdf.encode("latin-1")
+
+def synthetic_corpus():
+    corpus = []
+    for sentences in (20, 200, 2000):
+        text = "\n".join(f"{SAMPLE_SENTENCE} ({i})" for i in range(sentences))
+        corpus.append((f"sample_{sentences}.txt", text.encode("utf-8")))
+    for page_count in (10, 120):
+        pages = ["\n".join(f"{SAMPLE_SENTENCE[:80]} p{page} l{line}" for line in range(40)) for page in range(page_count)]
+        corpus.append((f"sample_{page_count}p.pdf", make_pdf(pages)))
+    return corpus
+
+def load_corpus(directory: str):
+    corpus = []
+    for name in sorted(os.listdir(directory)):
+        if name.endswith((".pdf", ".txt")):
+            with open(os.path.join(directory, name), "rb") as f:
+                corpus.append((name, f.read()))
+    if not corpus:
+        raise SystemExit(f"❌ No .pdf or .txt files found in {directory}")
+    return corpus
+
+# ============================================================
+# 3️⃣ Runner
+# ============================================================
+def percentile(values: list, pct: float):
+    ordered = sorted(values)
+    index = min(int(round(pct / 100 * (len(ordered) - 1))), len(ordered) - 1)
+    return ordered[index]
+
+def summarize_runs(finished: list, wall_seconds: float):
+    stages = {}
+    for job in finished:
+        for entry in job["trace"]:
+            stages.setdefault(entry["stage"], []).append(entry["durationMs"])
+        stages.setdefault("total", []).append(job["durationMs"])
+    return {
+        "jobs": len(finished),
+        "failed": sum(1 for job in finished if job["status"] != "completed"),
+        "wallSeconds": round(wall_seconds, 3),
+        "jobsPerSecond": round(len(finished) / wall_seconds, 3) if wall_seconds else None,
+        "stages": {
+            stage: {
+                "p50Ms": percentile(values, 50),
+                "p95Ms": percentile(values, 95),
+                "maxMs": max(values),
+            }
+            for stage, values in stages.items()
+        },
+    }
+
+def run_jobs(corpus: list, total_jobs: int):
+    submitted = []
+    started = time.perf_counter()
+    for i in range(total_jobs):
+        filename, data = corpus[i % len(corpus)]
+        job = main.create_job(filename, "application/pdf" if filename.endswith(".pdf") else "text/plain")
+        if job is None:
+            raise SystemExit("❌ Job queue is full; raise MAX_PENDING_JOBS for this benchmark")
+        submitted.append((job, main.job_executor.submit(main.run_pipeline, job, data)))
+    wait([future for _, future in submitted])
+    wall_seconds = time.perf_counter() - started
+
+    for job, _ in submitted:
+        if job["status"] != "completed":
+            print(f"❌ {job['fileName']}: {job['error']}")
+        elif job["result"]:
+            audio_path = job["result"]["audio_path"]
+            if os.path.exists(audio_path):
+                os.remove(audio_path)
+    return [job for job, _ in submitted], wall_seconds
+
+def run_benchmark(corpus: list, total_jobs: int, warm_cache: bool):
+    if warm_cache:
+        # One untimed pass so every measured job is a cache hit
+        run_jobs(corpus, len(corpus))
+    report = summarize_runs(*run_jobs(corpus, total_jobs))
+    report["cache"] = "warm" if warm_cache else "cold"
+    return report
+
+def compare(report: dict, baseline: dict, tolerance: float):
+    if baseline.get("cache", "cold") != report["cache"]:
+        return [f"cache mode differs from baseline ({baseline.get('cache', 'cold')} vs {report['cache']})"]
+    regressions = []
+    for stage, stats in report["stages"].items():
+        previous = baseline.get("stages", {}).get(stage)
+        if previous and stats["p95Ms"] > previous["p95Ms"] * (1 + tolerance):
+            regressions.append(f"{stage}: p95 {previous['p95Ms']}ms -> {stats['p95Ms']}ms")
+    previous_throughput = baseline.get("jobsPerSecond")
+    if previous_throughput and report["jobsPerSecond"] < previous_throughput * (1 - tolerance):
+        regressions.append(f"throughput: {previous_throughput} -> {report['jobsPerSecond']} jobs/s")
+    return regressions
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark the podcast pipeline with stub backends")
+    parser.add_argument("--corpus", help="Directory of .pdf/.txt files (default: synthetic corpus)")
+    parser.add_argument("--jobs", type=int, default=10, help="Number of uploads to run")
+    parser.add_argument("--summarizer-latency", type=float, default=0.05, help="Stub summarizer seconds per 1k tokens")
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="Stub Gemini seconds per script")
+    parser.add_argument("--tts-latency", type=float, default=0.1, help="Stub TTS seconds per request")
+    parser.add_argument("--script-lines", type=int, default=24, help="Dialogue lines in each stub script")
+    parser.add_argument("--warm-cache", action="store_true", help="Pre-fill the content cache instead of running cold")
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    parser.add_argument("--baseline", help="Compare against a previous JSON report")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative regression (default 20%%)")
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    args = parse_args()
+    try:
+        # Same order as the app lifespan: fork the PDF workers before any other thread starts
+        main.start_pdf_pool()
+        install_stubs(args)
+        corpus = load_corpus(args.corpus) if args.corpus else synthetic_corpus()
+
+        report = run_benchmark(corpus, args.jobs, args.warm_cache)
+        main.podcast_writer.stop()
+        main.stop_pdf_pool()
+    finally:
+        shutil.rmtree(BENCH_DIR, ignore_errors=True)
+
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f"❌ Regression: {regression}")
+        if regressions:
+            sys.exit(1)
+        print("✅ No regressions against baseline")
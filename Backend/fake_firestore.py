@@ -0,0 +1,141 @@
+"""
+In-memory stand-in for the subset of the Firestore client used by main.py.
+
+Supports documents (get/set with merge), batched writes, and collection
+queries with order_by, select, limit, start_after and stream. Used by the
+benchmark harness and the tests.
+"""
+
+class FakeSnapshot:
+    def __init__(self, doc_id: str, data: dict = None):
+        self.id = doc_id
+        self.exists = data is not None
+        self.data = data
+
+    def to_dict(self):
+        return dict(self.data) if self.exists else None
+
+    def get(self, field: str):
+        return self.data.get(field)
+
+class FakeDocument:
+    def __init__(self, collection, doc_id: str):
+        self.collection = collection
+        self.id = doc_id
+
+    def set(self, data: dict, merge: bool = False):
+        store = self.collection.store
+        if merge and self.id in store:
+            store[self.id].update(data)
+        else:
+            store[self.id] = dict(data)
+
+    def get(self):
+        self.collection.reads += 1
+        data = self.collection.store.get(self.id)
+        return FakeSnapshot(self.id, dict(data) if data is not None else None)
+
+class FakeQuery:
+    def __init__(self, collection, orders=(), fields=None, limit_count=None, cursor=None):
+        self.collection = collection
+        self.orders = tuple(orders)
+        self.fields = fields
+        self.limit_count = limit_count
+        self.cursor = cursor
+
+    def copy(self, **changes):
+        options = {
+            "orders": self.orders,
+            "fields": self.fields,
+            "limit_count": self.limit_count,
+            "cursor": self.cursor,
+        }
+        options.update(changes)
+        return FakeQuery(self.collection, **options)
+
+    def order_by(self, field: str, direction: str = "ASCENDING"):
+        return self.copy(orders=self.orders + ((field, direction),))
+
+    def select(self, fields):
+        return self.copy(fields=list(fields))
+
+    def limit(self, count: int):
+        return self.copy(limit_count=count)
+
+    def start_after(self, snapshot: FakeSnapshot):
+        return self.copy(cursor=snapshot)
+
+    def sort_key(self, doc_id: str, data: dict):
+        # Firestore breaks ties on the document id, in the direction of the last ordering
+        key = []
+        for field, direction in self.orders:
+            value = data[field]
+            key.append(value if direction == "ASCENDING" else Reversed(value))
+        last_direction = self.orders[-1][1] if self.orders else "ASCENDING"
+        key.append(doc_id if last_direction == "ASCENDING" else Reversed(doc_id))
+        return tuple(key)
+
+    def stream(self):
+        # Like Firestore, documents missing an ordered field are left out of the results
+        docs = [
+            (doc_id, data)
+            for doc_id, data in self.collection.store.items()
+            if all(field in data for field, _ in self.orders)
+        ]
+        docs.sort(key=lambda doc: self.sort_key(*doc))
+        if self.cursor is not None:
+            cursor_key = self.sort_key(self.cursor.id, self.cursor.data)
+            docs = [doc for doc in docs if self.sort_key(*doc) > cursor_key]
+        if self.limit_count is not None:
+            docs = docs[:self.limit_count]
+
+        self.collection.reads += max(len(docs), 1)
+        for doc_id, data in docs:
+            if self.fields is not None:
+                data = {field: data[field] for field in self.fields if field in data}
+            yield FakeSnapshot(doc_id, dict(data))
+
+class Reversed:
+    def __init__(self, value):
+        self.value = value
+
+    def __eq__(self, other):
+        return self.value == other.value
+
+    def __lt__(self, other):
+        return self.value > other.value
+
+    def __gt__(self, other):
+        return self.value < other.value
+
+class FakeCollection(FakeQuery):
+    def __init__(self):
+        super().__init__(self)
+        self.store = {}
+        self.reads = 0
+
+    def document(self, doc_id: str):
+        return FakeDocument(self, doc_id)
+
+class FakeBatch:
+    def __init__(self):
+        self.writes = []
+
+    def set(self, doc_ref: FakeDocument, data: dict, merge: bool = False):
+        self.writes.append((doc_ref, data, merge))
+
+    def commit(self):
+        for doc_ref, data, merge in self.writes:
+            doc_ref.set(data, merge=merge)
+
+class FakeFirestore:
+    def __init__(self):
+        self.collections = {}
+
+    def collection(self, name: str):
+        if name not in self.collections:
+            self.collections[name] = FakeCollection()
+        return self.collections[name]
+
+    def batch(self):
+        return FakeBatch()
@@ -0,0 +1,29 @@
+import os
+import sys
+import tempfile
+
+# Point the content cache and Firestore spill file at a scratch directory before main is imported
+TEST_DIR = tempfile.mkdtemp(prefix="podcast-tests-")
+os.environ.setdefault("CACHE_DIR", os.path.join(TEST_DIR, "cache"))
+os.environ.setdefault("FIRESTORE_SPILL_PATH", os.path.join(TEST_DIR, "firestore_spill.jsonl"))
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from fake_firestore import FakeFirestore
+
+@pytest.fixture
+def db():
+    fake = FakeFirestore()
+    main.firebase_db.set(fake)
+    main.invalidate_podcasts_cache()
+    yield fake
+    main.invalidate_podcasts_cache()
+
+@pytest.fixture
+def client():
+    # No lifespan: the tests do not need the PDF pool or the background writer thread
+    return TestClient(main.app)
@@ -0,0 +1,40 @@
+import os
+
+import pytest
+
+import main
+
+AUDIO = bytes(range(256)) * 4
+
+@pytest.fixture
+def audio_id():
+    os.makedirs(main.AUDIO_DIR, exist_ok=True)
+    path = main.audio_path_for("ef56")
+    with open(path, "wb") as f:
+        f.write(AUDIO)
+    yield "ef56"
+    os.remove(path)
+
+def test_full_file_without_range(client, audio_id):
+    response = client.get(f"/audio/{audio_id}")
+    assert response.status_code == 200
+    assert response.content == AUDIO
+
+def test_single_range_is_partial(client, audio_id):
+    response = client.get(f"/audio/{audio_id}", headers={"Range": "bytes=10-19"})
+    assert response.status_code == 206
+    assert response.headers["content-range"] == f"bytes 10-19/{len(AUDIO)}"
+    assert response.content == AUDIO[10:20]
+
+    response = client.get(f"/audio/{audio_id}", headers={"Range": "bytes=-4"})
+    assert response.content == AUDIO[-4:]
+
+def test_multiple_ranges_get_the_whole_file(client, audio_id):
+    response = client.get(f"/audio/{audio_id}", headers={"Range": "bytes=0-1,3-4"})
+    assert response.status_code == 200
+    assert response.content == AUDIO
+
+def test_unsatisfiable_range_is_rejected(client, audio_id):
+    response = client.get(f"/audio/{audio_id}", headers={"Range": f"bytes={len(AUDIO)}-"})
+    assert response.status_code == 416
+    assert response.headers["content-range"] == f"bytes */{len(AUDIO)}"
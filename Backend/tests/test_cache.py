@@ -0,0 +1,42 @@
+import os
+
+import main
+
+def test_index_is_built_on_first_use(tmp_path):
+    cache = main.DiskCache(str(tmp_path / "cache"), 1024)
+    assert cache.scanned_at is None
+    assert not os.path.exists(tmp_path / "cache")
+    assert cache.get("summary", "k1") is None
+    assert cache.scanned_at is not None
+
+def test_workers_read_each_others_entries(tmp_path):
+    first = main.DiskCache(str(tmp_path), 1024)
+    second = main.DiskCache(str(tmp_path), 1024)
+    assert second.get("summary", "k1") is None
+
+    first.set("summary", "k1", b"hello")
+    assert second.get("summary", "k1") == b"hello"
+    assert second.report()["bytes"] == 5
+
+def test_size_cap_covers_every_workers_entries(tmp_path):
+    first = main.DiskCache(str(tmp_path), 100)
+    second = main.DiskCache(str(tmp_path), 100)
+    first.set("audio", "a1", b"x" * 40)
+    first.set("audio", "a2", b"x" * 40)
+    os.utime(first._path("audio", "a1"), (1, 1))
+
+    # The second worker has not seen the first one's files, but its rescan before evicting does
+    second.set("audio", "b1", b"x" * 40)
+    on_disk = sum(len(names) for _, _, names in os.walk(tmp_path))
+    assert on_disk == 2
+    assert first.get("audio", "a1") is None
+    assert second.get("audio", "a2") == b"x" * 40
+    assert second.report()["namespaces"]["audio"]["evictions"] == 1
+
+def test_summary_cache_key_follows_summarizer_settings(monkeypatch):
+    settings = main.summary_settings()
+    for name, value in (("SUMMARIZER_PRECISION", "int8"), ("SUMMARY_CHUNK_TOKENS", 1024), ("SUMMARY_CHUNK_MAX_LENGTH", 128)):
+        with monkeypatch.context() as patch:
+            patch.setattr(main, name, value)
+            assert main.summary_settings() != settings
+    assert main.summary_settings() == settings
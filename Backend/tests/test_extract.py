@@ -0,0 +1,17 @@
+import shutil
+
+import benchmark
+import main
+
+def teardown_module():
+    shutil.rmtree(benchmark.BENCH_DIR, ignore_errors=True)
+
+def test_page_ranges_match_serial_extraction(tmp_path):
+    pages = [f"Page {page}" for page in range(5)]
+    data = benchmark.make_pdf(pages)
+    path = tmp_path / "book.pdf"
+    path.write_bytes(data)
+
+    serial = list(main.iter_pdf_pages(data))
+    assert serial == pages
+    assert main.extract_page_range(str(path), 0, 2) + main.extract_page_range(str(path), 2, 5) == serial
@@ -0,0 +1,138 @@
+import json
+import os
+
+import pytest
+
+import main
+from fake_firestore import FakeFirestore
+
+DEAD_PID = 99999999
+
+class FlakyFirestore(FakeFirestore):
+    # Fails the first `failures` commits, and runs `during_commit` while a batch is in flight
+    def __init__(self, failures: int = 0, during_commit=None):
+        super().__init__()
+        self.failures = failures
+        self.during_commit = during_commit
+
+    def batch(self):
+        batch = super().batch()
+        commit = batch.commit
+
+        def flaky_commit():
+            if self.during_commit:
+                self.during_commit()
+            if self.failures:
+                self.failures -= 1
+                raise RuntimeError("Firestore unavailable")
+            commit()
+
+        batch.commit = flaky_commit
+        return batch
+
+@pytest.fixture
+def make_writer(tmp_path, monkeypatch):
+    # A long interval keeps the background thread out of the way; the tests flush by hand
+    monkeypatch.setattr(main, "FIRESTORE_FLUSH_INTERVAL", 60)
+    writers = []
+
+    def make():
+        writer = main.FirestoreWriter("podcasts", str(tmp_path / "spill.jsonl"))
+        writers.append(writer)
+        return writer
+
+    yield make
+    for writer in writers:
+        with writer.condition:
+            writer.pending.clear()
+        writer.stop()
+
+def write_spill(path, *entries):
+    with open(path, "w") as f:
+        for entry in entries:
+            f.write(json.dumps(entry) + "\n")
+
+def read_spill(path):
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return [json.loads(line) for line in f]
+
+def test_jobs_interrupted_by_a_restart_are_marked_failed(tmp_path, make_writer):
+    write_spill(
+        tmp_path / "spill.jsonl",
+        {"id": "running", "data": {"status": "processing", "stage": "tts"}, "merge": True},
+        {"id": "waiting", "data": {"status": "queued"}, "merge": True},
+        {"id": "done", "data": {"status": "completed"}, "merge": False},
+    )
+    writer = make_writer()
+    assert writer.pending["running"]["data"] == {"status": "failed", "stage": "tts", "error": "Interrupted by a server restart"}
+    assert writer.pending["waiting"]["data"]["status"] == "failed"
+    assert writer.pending["done"]["data"] == {"status": "completed"}
+
+def test_dead_and_legacy_spill_files_are_adopted(tmp_path, make_writer):
+    write_spill(tmp_path / "spill.jsonl", {"id": "legacy", "data": {"status": "completed"}, "merge": False})
+    write_spill(tmp_path / f"spill.jsonl.{DEAD_PID}", {"id": "dead", "data": {"status": "completed"}, "merge": False})
+    live = tmp_path / f"spill.jsonl.{os.getppid()}"
+    write_spill(live, {"id": "live", "data": {"status": "completed"}, "merge": False})
+
+    writer = make_writer()
+    assert set(writer.pending) == {"legacy", "dead"}
+    # The adopted records now live only in our own file; a live worker's file is left alone
+    assert sorted(entry["id"] for entry in read_spill(writer.spill_path)) == ["dead", "legacy"]
+    assert sorted(os.listdir(tmp_path)) == sorted([os.path.basename(writer.spill_path), live.name])
+
+def test_spill_file_claimed_by_another_worker_first_is_skipped(tmp_path, make_writer, monkeypatch):
+    write_spill(tmp_path / f"spill.jsonl.{DEAD_PID}", {"id": "dead", "data": {"status": "completed"}, "merge": False})
+
+    def lost_race(src, dst):
+        raise FileNotFoundError(src)
+
+    monkeypatch.setattr(main.os, "rename", lost_race)
+    writer = make_writer()
+    assert not writer.pending
+
+def test_replay_merges_partial_updates_and_replaces_full_writes(tmp_path, make_writer):
+    write_spill(
+        tmp_path / "spill.jsonl",
+        {"id": "a", "data": {"fileName": "a.pdf", "status": "completed"}, "merge": False},
+        {"id": "a", "data": {"audioUrl": "/audio/a"}, "merge": True},
+        {"id": "b", "data": {"fileName": "b.pdf", "stage": "tts"}, "merge": True},
+        {"id": "b", "data": {"fileName": "b2.pdf", "status": "completed"}, "merge": False},
+    )
+    writer = make_writer()
+    assert writer.pending["a"] == {"data": {"fileName": "a.pdf", "status": "completed", "audioUrl": "/audio/a"}, "merge": False}
+    assert writer.pending["b"] == {"data": {"fileName": "b2.pdf", "status": "completed"}, "merge": False}
+
+def test_failed_batch_is_kept_and_retried(make_writer):
+    db = FlakyFirestore(failures=1)
+    main.firebase_db.set(db)
+    writer = make_writer()
+    writer.write("a", {"status": "completed"})
+
+    assert not writer.flush()
+    assert "a" in writer.pending
+    assert [entry["id"] for entry in read_spill(writer.spill_path)] == ["a"]
+    assert "a" not in db.collection("podcasts").store
+
+    assert writer.flush()
+    assert not writer.pending
+    assert read_spill(writer.spill_path) == []
+    assert db.collection("podcasts").store["a"] == {"status": "completed"}
+
+def test_write_during_an_inflight_batch_is_not_lost(make_writer):
+    writer = make_writer()
+    db = FlakyFirestore(during_commit=lambda: writer.write("a", {"stage": "store"}, merge=True))
+    main.firebase_db.set(db)
+    writer.write("a", {"status": "processing"}, merge=True)
+
+    assert writer.flush()
+    # The batch committed the older entry; the newer one stays pending and spilled
+    assert db.collection("podcasts").store["a"] == {"status": "processing"}
+    assert writer.pending["a"]["data"] == {"status": "processing", "stage": "store"}
+    assert [entry["data"] for entry in read_spill(writer.spill_path)] == [{"status": "processing", "stage": "store"}]
+
+    db.during_commit = None
+    assert writer.flush()
+    assert db.collection("podcasts").store["a"] == {"status": "processing", "stage": "store"}
+    assert read_spill(writer.spill_path) == []
@@ -0,0 +1,72 @@
+import os
+
+import main
+
+def store_record(db, job_id: str, record: dict):
+    db.collection("podcasts").document(job_id).set({"id": job_id, "fileName": "book.pdf", **record})
+
+def test_unknown_job_is_404(db, client):
+    assert client.get("/jobs/missing").status_code == 404
+
+def test_status_of_another_workers_job_comes_from_firestore(db, client):
+    store_record(db, "remote", {"status": "processing", "stage": "script"})
+    body = client.get("/jobs/remote").json()
+    assert body["status"] == "running"
+    assert body["stage"] == "script"
+    assert body["stages"] == {
+        "extract": "completed",
+        "summarize": "completed",
+        "script": "running",
+        "tts": "pending",
+        "store": "pending",
+    }
+    assert client.get("/jobs/remote/result").status_code == 409
+
+def test_result_of_another_workers_job_comes_from_firestore(db, client):
+    store_record(db, "remote", {
+        "status": "completed",
+        "summary": "short",
+        "podcastScript": "Alex: hi",
+        "audioPath": "audio_outputs/podcast_remote.mp3",
+        "audioUrl": "/audio/remote",
+    })
+    assert client.get("/jobs/remote").json()["stages"]["store"] == "completed"
+    result = client.get("/jobs/remote/result").json()
+    assert result["podcast_script"] == "Alex: hi"
+    assert result["audio_url"] == "/audio/remote"
+
+def test_failed_job_from_firestore_reports_its_error(db, client):
+    store_record(db, "remote", {"status": "failed", "stage": "tts", "error": "quota"})
+    body = client.get("/jobs/remote").json()
+    assert body["status"] == "failed"
+    assert body["stages"]["tts"] == "failed"
+    assert client.get("/jobs/remote/result").json()["detail"] == "quota"
+    assert client.get("/jobs/remote/audio").status_code == 500
+
+def test_audio_of_another_workers_finished_job_is_streamed_from_disk(db, client):
+    job_id = "ab12"
+    os.makedirs(main.AUDIO_DIR, exist_ok=True)
+    path = main.audio_path_for(job_id)
+    with open(path, "wb") as f:
+        f.write(b"\xff\xfb" * 100)
+    try:
+        store_record(db, job_id, {"status": "completed"})
+        response = client.get(f"/jobs/{job_id}/audio")
+        assert response.status_code == 200
+        assert response.content == b"\xff\xfb" * 100
+    finally:
+        os.remove(path)
+
+def test_oversized_upload_is_rejected(db, client, monkeypatch):
+    monkeypatch.setattr(main, "MAX_UPLOAD_BYTES", 10)
+    response = client.post("/upload_file/", files={"file": ("notes.txt", b"x" * 11, "text/plain")})
+    assert response.status_code == 413
+    assert not main.jobs
+
+def test_job_record_keeps_the_uploaded_file_url():
+    job = main.create_job("book.pdf", "application/pdf", "https://storage.example/book.pdf")
+    try:
+        assert main.job_record(job, "queued")["fileUrl"] == "https://storage.example/book.pdf"
+        assert "fileUrl" not in main.job_record({**job, "fileUrl": None}, "queued")
+    finally:
+        main.jobs.pop(job["id"])
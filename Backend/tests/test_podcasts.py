@@ -0,0 +1,105 @@
+from datetime import datetime, timedelta, timezone
+
+import main
+
+STARTED = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+def seed(db, count: int):
+    podcasts = db.collection("podcasts")
+    for i in range(count):
+        podcasts.document(f"p{i:03d}").set({
+            "id": f"p{i:03d}",
+            "fileName": f"file{i}.pdf",
+            "summary": "long summary text",
+            "podcastScript": "Alex: hi",
+            "status": "completed",
+            "createdAt": STARTED + timedelta(minutes=i),
+        })
+
+def newest_first(count: int):
+    return [f"p{i:03d}" for i in reversed(range(count))]
+
+def collect_pages(client, limit: int):
+    ids, cursor, pages = [], None, 0
+    while True:
+        params = {"limit": limit}
+        if cursor:
+            params["cursor"] = cursor
+        body = client.get("/podcasts/", params=params).json()
+        ids += [podcast["id"] for podcast in body["podcasts"]]
+        pages += 1
+        cursor = body["next_cursor"]
+        if cursor is None:
+            return ids, pages
+
+def test_pages_follow_cursor_in_created_order(db, client):
+    seed(db, 5)
+    ids, pages = collect_pages(client, 2)
+    assert ids == newest_first(5)
+    assert pages == 3
+
+def test_no_cursor_when_last_page_is_exactly_full(db, client):
+    seed(db, 4)
+    first = client.get("/podcasts/", params={"limit": 2}).json()
+    assert first["next_cursor"] == "p002"
+    second = client.get("/podcasts/", params={"limit": 2, "cursor": first["next_cursor"]}).json()
+    assert [podcast["id"] for podcast in second["podcasts"]] == ["p001", "p000"]
+    assert second["next_cursor"] is None
+
+def test_limit_is_clamped(db, client):
+    seed(db, main.PODCASTS_MAX_PAGE_SIZE + 5)
+    assert len(client.get("/podcasts/", params={"limit": 0}).json()["podcasts"]) == 1
+    body = client.get("/podcasts/", params={"limit": 1000}).json()
+    assert len(body["podcasts"]) == main.PODCASTS_MAX_PAGE_SIZE
+    assert body["next_cursor"] is not None
+
+def test_invalid_cursor_is_rejected(db, client):
+    seed(db, 3)
+    response = client.get("/podcasts/", params={"cursor": "missing"})
+    assert response.status_code == 400
+
+def test_list_projects_fields(db, client):
+    seed(db, 1)
+    podcast = client.get("/podcasts/").json()["podcasts"][0]
+    assert "summary" not in podcast and "podcastScript" not in podcast
+    assert podcast["createdAt"] == STARTED.isoformat()
+
+    podcast = client.get("/podcasts/", params={"fields": "id,summary"}).json()["podcasts"][0]
+    assert podcast == {"id": "p000", "summary": "long summary text"}
+
+def test_detail_returns_full_record(db, client):
+    seed(db, 1)
+    assert client.get("/podcasts/p000").json()["podcastScript"] == "Alex: hi"
+    assert client.get("/podcasts/missing").status_code == 404
+
+def test_list_is_cached_until_a_write_lands(db, client):
+    seed(db, 2)
+    assert len(client.get("/podcasts/").json()["podcasts"]) == 2
+    reads = db.collection("podcasts").reads
+
+    # Served from the TTL cache: no new Firestore reads, and a direct write is not visible yet
+    seed(db, 3)
+    assert len(client.get("/podcasts/").json()["podcasts"]) == 2
+    assert db.collection("podcasts").reads == reads
+
+    podcast_id = main.store_in_firestore({"fileName": "new.pdf", "status": "completed"})
+    assert main.podcast_writer.flush_all()
+    ids = [podcast["id"] for podcast in client.get("/podcasts/").json()["podcasts"]]
+    assert ids[0] == podcast_id
+    assert len(ids) == 4
+
+def test_stage_updates_keep_cached_list_pages(db, client):
+    main.update_podcast_record("job-stage", {"status": "processing", "createdAt": STARTED})
+    assert main.podcast_writer.flush_all()
+    assert client.get("/podcasts/").json()["podcasts"][0]["status"] == "processing"
+    reads = db.collection("podcasts").reads
+
+    # Only the stage changes, which list views do not show: the cached page survives the flush
+    main.update_podcast_record("job-stage", {"status": "processing", "stage": "tts"})
+    assert main.podcast_writer.flush_all()
+    client.get("/podcasts/")
+    assert db.collection("podcasts").reads == reads
+
+    main.update_podcast_record("job-stage", {"status": "completed"})
+    assert main.podcast_writer.flush_all()
+    assert client.get("/podcasts/").json()["podcasts"][0]["status"] == "completed"
@@ -0,0 +1,107 @@
+import os
+import queue
+import shutil
+import threading
+import time
+
+import pytest
+
+import benchmark
+import main
+
+ALEX, JORDAN = main.VOICE_MAP["ALEX"], main.VOICE_MAP["JORDAN"]
+
+def teardown_module():
+    shutil.rmtree(benchmark.BENCH_DIR, ignore_errors=True)
+
+class BrokenGemini(benchmark.StubGemini):
+    # Streams `good_lines` lines, then fails like a dropped connection
+    def __init__(self, good_lines: int):
+        super().__init__(0, 20)
+        self.good_lines = good_lines
+
+    def stream_lines(self, lines: list):
+        for line in lines[:self.good_lines]:
+            yield benchmark.StubResponse(line)
+        raise ConnectionError("stream reset")
+
+class FailingTTS(benchmark.StubTextToSpeech):
+    # Rejects the `fail_at`-th request with an error that is not retried
+    def __init__(self, fail_at: int):
+        super().__init__(0.01)
+        self.fail_at = fail_at
+        self.calls = 0
+
+    def convert(self, voice_id: str, model_id: str, text: str):
+        self.calls += 1
+        if self.calls == self.fail_at:
+            raise PermissionError("invalid API key")
+        return super().convert(voice_id, model_id, text)
+
+@pytest.fixture
+def job(db, tmp_path, monkeypatch):
+    monkeypatch.setattr(main, "cache", benchmark.ColdCache())
+    main.tts_client.set(benchmark.StubTTSClient(0.01))
+    job = main.create_job("book.txt", "text/plain")
+    job["startedAt"] = time.perf_counter()
+    yield job
+    main.jobs.pop(job["id"], None)
+
+def statuses(job):
+    return {entry["stage"]: entry["status"] for entry in job["trace"]}
+
+def test_parser_joins_lines_split_across_chunks():
+    parser = main.ScriptLineParser()
+    assert parser.feed("Al") == []
+    assert parser.feed("ex: Hello") == []
+    assert parser.feed(" there.\r") == []
+    assert parser.feed("\nJor") == [(ALEX, "Hello there.")]
+    assert parser.feed("dan: Hi!\r\nNarrator: skipped\n") == [(JORDAN, "Hi!")]
+    assert parser.feed("Alex: No trailing newline") == []
+    assert parser.finish() == [(ALEX, "No trailing newline")]
+    assert parser.finish() == []
+
+def test_parser_matches_parse_script():
+    script = "Alex: One.\r\nJordan: Two [laughs].\n\nAlex: Three"
+    parser = main.ScriptLineParser()
+    streamed = [dialogue for i in range(0, len(script), 3) for dialogue in parser.feed(script[i:i + 3])]
+    assert streamed + parser.finish() == main.parse_script(script)
+
+def test_producer_blocks_while_tts_is_behind(db, monkeypatch):
+    monkeypatch.setattr(main, "cache", benchmark.ColdCache())
+    main.gemini_model.set(benchmark.StubGemini(0, 20))
+    lines = queue.Queue(maxsize=2)
+    cancelled = threading.Event()
+    producer = threading.Thread(target=main.produce_script, args=("summary", lines, cancelled))
+    producer.start()
+
+    time.sleep(0.3)
+    assert producer.is_alive()
+    assert lines.full()
+
+    received = list(main.consume_script(lines))
+    producer.join(timeout=5)
+    received = [item for item in received if item is not main.LINE_IDLE]
+    assert [text.split(" of ")[0] for _, text in received] == [f"Line {i}" for i in range(20)]
+
+def test_tts_failure_cancels_the_script_stage(job):
+    main.gemini_model.set(benchmark.StubGemini(0.5, 20))
+    client = benchmark.StubTTSClient(0.01)
+    client.text_to_speech = FailingTTS(fail_at=3)
+    main.tts_client.set(client)
+
+    with pytest.raises(PermissionError):
+        main.generate_script_and_audio(job, "summary")
+    assert statuses(job) == {"tts": "failed", "script": "cancelled"}
+    assert job["stages"]["script"] == "cancelled"
+    assert job["stage"] == "tts"
+    assert not os.path.exists(main.audio_path_for(job["id"]))
+
+def test_script_failure_deletes_the_partial_audio(job):
+    main.gemini_model.set(BrokenGemini(good_lines=3))
+
+    with pytest.raises(ConnectionError):
+        main.generate_script_and_audio(job, "summary")
+    assert statuses(job) == {"script": "failed", "tts": "completed"}
+    assert job["stage"] == "script"
+    assert not os.path.exists(main.audio_path_for(job["id"]))
@@ -0,0 +1,73 @@
+import time
+
+import pytest
+
+import main
+
+ALEX, JORDAN = main.VOICE_MAP["ALEX"], main.VOICE_MAP["JORDAN"]
+
+class ApiError(Exception):
+    def __init__(self, status_code: int):
+        super().__init__(f"status {status_code}")
+        self.status_code = status_code
+
+class FakeTTSClient:
+    # Returns each text as its audio; `delays` slow down chosen lines, `failures` raise before succeeding
+    def __init__(self, delays: dict = None, failures: dict = None):
+        self.text_to_speech = self
+        self.delays = delays or {}
+        self.failures = failures or {}
+        self.calls = []
+
+    def convert(self, voice_id: str, model_id: str, text: str):
+        self.calls.append(text)
+        failures = self.failures.get(text)
+        if failures:
+            error = failures.pop(0)
+            raise error
+        time.sleep(self.delays.get(text, 0))
+        yield text.encode("utf-8")
+
+@pytest.fixture(autouse=True)
+def fresh_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(main, "cache", main.DiskCache(str(tmp_path), 1024 * 1024))
+    monkeypatch.setattr(main, "TTS_RETRY_BACKOFF", 0.01)
+
+def test_merges_do_not_depend_on_stream_timing():
+    dialogue = [(ALEX, "Hi."), (ALEX, "Welcome back."), (JORDAN, "Thanks."), (ALEX, "Let's start.")]
+    stalled = [dialogue[0], main.LINE_IDLE, main.LINE_IDLE, dialogue[1], main.LINE_IDLE, dialogue[2], dialogue[3]]
+    merged = [item for item in main.merge_dialogue(stalled) if item is not main.LINE_IDLE]
+    assert merged == list(main.merge_dialogue(dialogue))
+    assert merged == [(ALEX, "Hi. Welcome back."), (JORDAN, "Thanks."), (ALEX, "Let's start.")]
+
+def test_merged_requests_stay_under_the_character_cap(monkeypatch):
+    monkeypatch.setattr(main, "TTS_MAX_CHARS", 20)
+    dialogue = [(ALEX, f"Line {i}.") for i in range(10)]
+    merged = list(main.merge_dialogue(dialogue))
+    assert all(len(text) <= 20 for _, text in merged)
+    assert len(merged) < len(dialogue)
+    assert " ".join(text for _, text in merged) == " ".join(text for _, text in dialogue)
+
+def test_segments_keep_dialogue_order_when_lines_finish_out_of_order():
+    client = FakeTTSClient(delays={"one": 0.2, "two": 0.1})
+    dialogue = [(ALEX, "one"), (JORDAN, "two"), (ALEX, "three"), (JORDAN, "four"), (ALEX, "five")]
+    assert list(main.synthesize_dialogue(dialogue, client)) == [b"one", b"two", b"three", b"four", b"five"]
+
+def test_transient_failures_are_retried(monkeypatch):
+    monkeypatch.setattr(main, "TTS_MAX_RETRIES", 3)
+    client = FakeTTSClient(failures={"hello": [ConnectionError("reset"), ApiError(503), ApiError(429)]})
+    assert list(main.synthesize_dialogue([(ALEX, "hello")], client)) == [b"hello"]
+    assert client.calls == ["hello"] * 4
+
+def test_retries_give_up_after_the_limit(monkeypatch):
+    monkeypatch.setattr(main, "TTS_MAX_RETRIES", 1)
+    client = FakeTTSClient(failures={"hello": [TimeoutError(), TimeoutError()]})
+    with pytest.raises(TimeoutError):
+        list(main.synthesize_dialogue([(ALEX, "hello")], client))
+    assert client.calls == ["hello"] * 2
+
+def test_auth_and_quota_errors_are_not_retried():
+    client = FakeTTSClient(failures={"hello": [ApiError(401)]})
+    with pytest.raises(ApiError):
+        list(main.synthesize_dialogue([(ALEX, "hello")], client))
+    assert client.calls == ["hello"]
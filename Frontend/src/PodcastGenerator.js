@@ -1,8 +1,7 @@
 // PodcastGenerator.jsx
 import React, { useState } from 'react';
-import { storage, db } from './firebase';
+import { storage } from './firebase';
 import { ref, uploadBytes, getDownloadURL } from 'firebase/storage';
-import { collection, addDoc, getDocs } from 'firebase/firestore';
 import axios from 'axios';
 import './PodcastGenerator.css';
 
@@ -12,9 +11,13 @@ const PodcastGenerator = () => {
   const [generating, setGenerating] = useState(false);
   const [result, setResult] = useState(null);
   const [podcasts, setPodcasts] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [liveAudioUrl, setLiveAudioUrl] = useState(null);
   const [error, setError] = useState('');
 
   const BACKEND_URL = 'http://localhost:8000'; // Your FastAPI backend URL
+  const PAGE_SIZE = 12;
+  const LIST_FIELDS = 'id,fileName,fileUrl,audioUrl,status,createdAt,summary';
 
   // Handle file selection
   const handleFileChange = (e) => {
@@ -41,6 +44,34 @@ const PodcastGenerator = () => {
     }
   };
 
+  // Poll the backend job until the pipeline finishes
+  const waitForJob = async (jobId) => {
+    const deadline = Date.now() + 600000; // 10 minutes for large files
+    // Another backend worker only sees the job once its record reaches Firestore
+    const notFoundDeadline = Date.now() + 30000;
+    while (Date.now() < deadline) {
+      let data;
+      try {
+        ({ data } = await axios.get(`${BACKEND_URL}/jobs/${jobId}`));
+      } catch (error) {
+        if (error.response?.status !== 404 || Date.now() > notFoundDeadline) {
+          throw error;
+        }
+        await new Promise((resolve) => setTimeout(resolve, 2000));
+        continue;
+      }
+      if (data.status === 'completed') {
+        const result = await axios.get(`${BACKEND_URL}/jobs/${jobId}/result`);
+        return result.data;
+      }
+      if (data.status === 'failed') {
+        throw new Error(data.error || 'Podcast generation failed');
+      }
+      await new Promise((resolve) => setTimeout(resolve, 2000));
+    }
+    throw new Error('Timed out waiting for podcast generation');
+  };
+
   // Generate podcast
   const generatePodcast = async () => {
     if (!file) {
@@ -50,6 +81,7 @@ const PodcastGenerator = () => {
 
     setGenerating(true);
     setError('');
+    setLiveAudioUrl(null);
     
     try {
       // Step 1: Upload file to Firebase Storage
@@ -60,41 +92,36 @@ const PodcastGenerator = () => {
       // Step 2: Send file to backend for processing
       const formData = new FormData();
       formData.append('file', file);
+      formData.append('file_url', fileUrl);
       
       console.log('Sending request to backend...');
       const response = await axios.post(`${BACKEND_URL}/upload_file/`, formData, {
         headers: {
           'Content-Type': 'multipart/form-data',
         },
-        timeout: 300000, // 5 minutes timeout for large files
       });
 
       console.log('Backend response:', response.data);
 
-      const { id, summary, podcast_script, audio_path, message } = response.data;
+      // Start playback right away: this stream follows the episode while its lines are synthesized
+      setLiveAudioUrl(`${BACKEND_URL}/jobs/${response.data.job_id}/audio`);
+
+      const jobResult = await waitForJob(response.data.job_id);
+      const { id, summary, podcast_script, audio_path, audio_url, message } = jobResult;
 
       if (!summary || !podcast_script) {
         throw new Error('Invalid response from server');
       }
 
-      // Step 3: Store results in Firestore
-      const podcastData = {
+      // Step 3: Update state with results (the backend has already stored the podcast in Firestore)
+      setResult({
+        id: id,
         fileName: file.name,
         fileUrl: fileUrl,
         summary: summary,
         podcastScript: podcast_script,
-        audioPath: audio_path,
-        createdAt: new Date().toISOString(),
-        backendId: id // Store the backend ID for reference
-      };
-
-      console.log('Storing in Firestore...');
-      const docRef = await addDoc(collection(db, 'podcasts'), podcastData);
-      
-      // Step 4: Update state with results
-      setResult({
-        id: docRef.id,
-        ...podcastData
+        audioPath: audio_url ? `${BACKEND_URL}${audio_url}` : audio_path,
+        createdAt: new Date().toISOString()
       });
 
       // Refresh podcast list
@@ -118,6 +145,7 @@ const PodcastGenerator = () => {
         errorMessage = 'Firestore access denied. Check your Firebase rules.';
       }
       
+      setLiveAudioUrl(null);
       setError(errorMessage);
       alert(errorMessage);
     } finally {
@@ -126,23 +154,39 @@ const PodcastGenerator = () => {
     }
   };
 
-  // Fetch all podcasts from Firestore
-  const fetchPodcasts = async () => {
+  const withAudioPath = (podcast) => ({
+    ...podcast,
+    audioPath: podcast.audioUrl ? `${BACKEND_URL}${podcast.audioUrl}` : null
+  });
+
+  // Fetch one page of podcasts (newest first) from the backend; pass a cursor to load the next page
+  const fetchPodcasts = async (cursor = null) => {
     try {
-      const querySnapshot = await getDocs(collection(db, 'podcasts'));
-      const podcastsList = [];
-      querySnapshot.forEach((doc) => {
-        podcastsList.push({ id: doc.id, ...doc.data() });
-      });
-      // Sort by date, newest first
-      podcastsList.sort((a, b) => new Date(b.createdAt) - new Date(a.createdAt));
-      setPodcasts(podcastsList);
+      const params = { limit: PAGE_SIZE, fields: LIST_FIELDS };
+      if (cursor) {
+        params.cursor = cursor;
+      }
+      const { data } = await axios.get(`${BACKEND_URL}/podcasts/`, { params });
+      const page = data.podcasts.map(withAudioPath);
+      setPodcasts((previous) => (cursor ? [...previous, ...page] : page));
+      setNextCursor(data.next_cursor);
     } catch (error) {
       console.error('Error fetching podcasts:', error);
       setError('Error loading previous podcasts');
     }
   };
 
+  // List pages leave out the script, so load the full podcast when it is opened
+  const viewPodcast = async (podcast) => {
+    try {
+      const { data } = await axios.get(`${BACKEND_URL}/podcasts/${podcast.id}`);
+      setResult(withAudioPath(data));
+    } catch (error) {
+      console.error('Error fetching podcast:', error);
+      setError('Error loading podcast');
+    }
+  };
+
   // Load podcasts on component mount
   React.useEffect(() => {
     fetchPodcasts();
@@ -205,6 +249,16 @@ const PodcastGenerator = () => {
             </p>
           </div>
         )}
+
+        {/* Live Preview: kept after the job finishes so playback is not cut off */}
+        {liveAudioUrl && (
+          <div className="audio-container">
+            <h4>Live Preview</h4>
+            <audio controls autoPlay className="audio-player" src={liveAudioUrl}>
+              Your browser does not support the audio element.
+            </audio>
+          </div>
+        )}
       </div>
 
       {/* Current Result */}
@@ -266,7 +320,7 @@ const PodcastGenerator = () => {
 
       {/* Previous Podcasts */}
       <div className="history-section">
-        <h3>Previous Podcasts ({podcasts.length})</h3>
+        <h3>Previous Podcasts</h3>
         {podcasts.length === 0 ? (
           <div className="no-podcasts">
             <p>No podcasts generated yet. Upload a document to get started!</p>
@@ -283,18 +337,25 @@ const PodcastGenerator = () => {
                 </div>
                 
                 <div className="preview-section">
-                  <p><strong>Summary:</strong> {podcast.summary?.substring(0, 150)}...</p>
+                  {podcast.status === 'completed' ? (
+                    <p><strong>Summary:</strong> {podcast.summary?.substring(0, 150)}...</p>
+                  ) : (
+                    <p><strong>Status:</strong> {podcast.status}</p>
+                  )}
                 </div>
                 
-                <div className="audio-preview">
-                  <audio controls className="small-audio-player">
-                    <source src={podcast.audioPath} type="audio/mpeg" />
-                  </audio>
-                </div>
+                {podcast.audioPath && (
+                  <div className="audio-preview">
+                    <audio controls className="small-audio-player">
+                      <source src={podcast.audioPath} type="audio/mpeg" />
+                    </audio>
+                  </div>
+                )}
                 
                 <div className="actions">
                   <button 
-                    onClick={() => setResult(podcast)}
+                    onClick={() => viewPodcast(podcast)}
+                    disabled={podcast.status !== 'completed'}
                     className="view-btn"
                   >
                     View Full
@@ -312,6 +373,11 @@ const PodcastGenerator = () => {
             ))}
           </div>
         )}
+        {nextCursor && (
+          <button onClick={() => fetchPodcasts(nextCursor)} className="view-btn">
+            Load More
+          </button>
+        )}
       </div>
     </div>
   );